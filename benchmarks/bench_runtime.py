@@ -0,0 +1,319 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmarks del runtime BrickScript
+
+Ejecuta Snake y Tetris con entradas programadas sobre varios tamaños de
+tablero y mide:
+- ticks de simulación por segundo
+- frames renderizados por segundo (salida a un sumidero nulo)
+- tiempo de fijar una pieza eliminando líneas (Tetris)
+- ticks por segundo con muchas bombas vivas en el tablero (Tetris)
+- memoria máxima (si tracemalloc está disponible)
+
+Cada medida de tiempo se repite varias veces y se conserva la mejor, para
+que el ruido de la máquina no se confunda con una regresión. Los
+resultados se guardan en JSON junto con el modo de ejecución y se comparan
+con una línea base del mismo modo para detectar regresiones de rendimiento
+en runtime.py.
+
+Uso:
+    python benchmarks/bench_runtime.py
+    python benchmarks/bench_runtime.py --salida resultados.json
+    python benchmarks/bench_runtime.py --actualizar-base
+    python benchmarks/bench_runtime.py --rapido --repeticiones 3
+"""
+
+import sys
+import os
+import json
+import time
+import random
+import argparse
+
+try:
+    import tracemalloc
+except ImportError:
+    # Python 2: sin medición de memoria
+    tracemalloc = None
+
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+RAIZ = os.path.dirname(DIRECTORIO)
+sys.path.insert(0, RAIZ)
+
+from runtime import Juego, cargar_json
+
+# Línea base versionada con el repositorio
+RUTA_BASE = os.path.join(DIRECTORIO, 'baseline_runtime.json')
+
+# Reloj de mayor resolución disponible
+reloj = getattr(time, 'perf_counter', time.time)
+
+# Casos de Snake: (ancho, alto, longitud inicial)
+CASOS_SNAKE = [
+    (25, 25, 3),
+    (25, 25, 20),
+    (200, 200, 3),
+    (200, 200, 150),
+    (1000, 1000, 500),
+]
+
+# Casos de Tetris: (ancho, alto)
+CASOS_TETRIS = [
+    (10, 20),
+    (100, 200),
+    (1000, 1000),
+]
+
+# Entradas programadas, una por tick (None = sin tecla)
+ENTRADAS_SNAKE = (
+    ['moverAbajo'] + [None] * 7 + ['moverDerecha'] + [None] * 7 +
+    ['moverArriba'] + [None] * 7 + ['moverDerecha'] + [None] * 7
+)
+ENTRADAS_TETRIS = [
+    'moverIzquierda', None, 'evitarCaida', None, 'moverDerecha',
+    'moverDerecha', None, 'acelerarAbajo', 'caidaInmediata', None,
+]
+
+# Métricas en las que un valor mayor es mejor
+METRICAS_MAYOR_MEJOR = ('ticks_por_segundo', 'frames_por_segundo',
+                        'ticks_con_bombas_por_segundo')
+
+class SalidaNula(object):
+    """Sumidero de escritura que descarta todo"""
+    def write(self, datos):
+        pass
+
+    def flush(self):
+        pass
+
+def crear_juego(datos):
+    """Crea un juego que renderiza a un sumidero nulo sin limpiar pantalla"""
+    juego = Juego(datos, salida=SalidaNula())
+    juego.limpiar_pantalla = lambda: None
+    return juego
+
+def datos_snake(base, ancho, alto, longitud):
+    """Configuración de Snake para un tamaño de tablero y longitud dados"""
+    datos = json.loads(json.dumps(base))
+    datos['anchoTablero'] = ancho
+    datos['altoTablero'] = alto
+    serpiente = datos.setdefault('serpiente', {})
+    serpiente['longitudInicial'] = longitud
+    serpiente['posXInicial'] = min(ancho - 1, longitud + ancho // 4)
+    serpiente['posYInicial'] = alto // 2
+    # Con bordes envolventes la serpiente programada no muere en la pared
+    datos.setdefault('reglasJuego', {})['chocarConBorde'] = False
+    return datos
+
+def datos_tetris(base, ancho, alto):
+    """Configuración de Tetris para un tamaño de tablero dado"""
+    datos = json.loads(json.dumps(base))
+    datos['anchoTablero'] = ancho
+    datos['altoTablero'] = alto
+    return datos
+
+def jugar(datos, entradas, ticks, preparar=None):
+    """Ejecuta ticks de simulación con entradas programadas
+
+    preparar(juego), si se indica, se llama al crear el juego y tras cada
+    reinicio.
+    """
+    juego = crear_juego(datos)
+    if preparar:
+        preparar(juego)
+    for i in range(ticks):
+        accion = entradas[i % len(entradas)]
+        if accion:
+            juego.ejecutar_accion(accion)
+        juego.paso()
+        if not juego.jugando:
+            juego.reiniciar()
+            if preparar:
+                preparar(juego)
+    return juego
+
+def mejor(medir, repeticiones, mayor_mejor=True):
+    """Repite una medida y devuelve la mejor de todas"""
+    valores = [medir() for i in range(repeticiones)]
+    return max(valores) if mayor_mejor else min(valores)
+
+def medir_ticks(datos, entradas, ticks, preparar=None):
+    """Ticks de simulación por segundo"""
+    random.seed(0)
+    inicio = reloj()
+    jugar(datos, entradas, ticks, preparar)
+    return ticks / (reloj() - inicio)
+
+def colocar_bombas(juego):
+    """Llena en damero las 4 filas inferiores con bombas que no explotan"""
+    for y in range(juego.alto - 4, juego.alto):
+        fila = juego.tetris_grid_fijo.setdefault(y, {})
+        for x in range(y % 2, juego.ancho, 2):
+            fila[x] = Juego.CELDA_BOMBA
+            juego.tetris_bombas[(x, y)] = 10 ** 9
+            juego.tetris_alturas[x] = min(juego.tetris_alturas[x], y)
+
+def medir_memoria(datos, entradas, ticks):
+    """Memoria máxima en KB durante la partida (None sin tracemalloc)"""
+    if tracemalloc is None:
+        return None
+    random.seed(0)
+    tracemalloc.start()
+    jugar(datos, entradas, ticks)
+    memoria = tracemalloc.get_traced_memory()[1] // 1024
+    tracemalloc.stop()
+    return memoria
+
+def medir_frames(datos, frames):
+    """Frames renderizados por segundo"""
+    random.seed(0)
+    juego = crear_juego(datos)
+    inicio = reloj()
+    for i in range(frames):
+        juego.renderizar()
+    return frames / (reloj() - inicio)
+
+def medir_bloqueo(datos, repeticiones):
+    """Tiempo medio en microsegundos de fijar una pieza que elimina 4 líneas"""
+    random.seed(0)
+    juego = crear_juego(datos)
+    pieza = {'color': 'bench', 'patron': [[[1], [1], [1], [1]]]}
+    hueco = juego.ancho // 2
+    total = 0.0
+
+    for i in range(repeticiones):
+        # Cuatro filas inferiores llenas salvo la columna del hueco
+        juego.jugando = True
+        juego.tetris_grid_fijo = {}
+        for y in range(juego.alto - 4, juego.alto):
+            fila = dict((x, Juego.CELDA_BLOQUE) for x in range(juego.ancho))
+            del fila[hueco]
+            juego.tetris_grid_fijo[y] = fila
+        juego.tetris_alturas = [juego.alto - 4] * juego.ancho
+        juego.tetris_alturas[hueco] = juego.alto
+
+        juego.tetris_bombas = {}
+        juego.tetris_pieza_actual = pieza
+        juego.tetris_pieza_es_bomba = False
+        juego.tetris_pieza_rotacion = 0
+        juego.tetris_pieza_x = hueco
+        juego.tetris_pieza_y = juego.alto - 4
+
+        inicio = reloj()
+        juego.tetris_bloquear_pieza()
+        total += reloj() - inicio
+
+    return total / repeticiones * 1e6
+
+def ejecutar(rapido=False, veces=5):
+    """Ejecuta todos los casos y devuelve los resultados por caso
+
+    Cada medida de tiempo se toma veces veces y se conserva la mejor.
+    """
+    ticks = 500 if rapido else 5000
+    frames = 50 if rapido else 500
+    repeticiones = 20 if rapido else 200
+
+    base_snake = cargar_json(os.path.join(RAIZ, 'ejemplos', 'snake.json'))
+    base_tetris = cargar_json(os.path.join(RAIZ, 'ejemplos', 'tetris.json'))
+    resultados = {}
+
+    for ancho, alto, longitud in CASOS_SNAKE:
+        datos = datos_snake(base_snake, ancho, alto, longitud)
+        resultados['snake_{}x{}_L{}'.format(ancho, alto, longitud)] = {
+            'ticks_por_segundo': round(mejor(
+                lambda: medir_ticks(datos, ENTRADAS_SNAKE, ticks), veces), 1),
+            'frames_por_segundo': round(mejor(lambda: medir_frames(datos, frames), veces), 1),
+            'memoria_max_kb': medir_memoria(datos, ENTRADAS_SNAKE, ticks // 10),
+        }
+
+    for ancho, alto in CASOS_TETRIS:
+        datos = datos_tetris(base_tetris, ancho, alto)
+        resultados['tetris_{}x{}'.format(ancho, alto)] = {
+            'ticks_por_segundo': round(mejor(
+                lambda: medir_ticks(datos, ENTRADAS_TETRIS, ticks), veces), 1),
+            'frames_por_segundo': round(mejor(lambda: medir_frames(datos, frames), veces), 1),
+            'bloqueo_4_lineas_us': round(mejor(
+                lambda: medir_bloqueo(datos, repeticiones), veces, mayor_mejor=False), 2),
+            'ticks_con_bombas_por_segundo': round(mejor(
+                lambda: medir_ticks(datos, ENTRADAS_TETRIS, ticks, colocar_bombas), veces), 1),
+            'memoria_max_kb': medir_memoria(datos, ENTRADAS_TETRIS, ticks // 10),
+        }
+
+    return resultados
+
+def comparar(resultados, base, tolerancia):
+    """Devuelve la lista de regresiones respecto a la línea base"""
+    regresiones = []
+    for caso, metricas in sorted(resultados.items()):
+        for metrica, valor in sorted(metricas.items()):
+            anterior = base.get(caso, {}).get(metrica)
+            if valor is None or not anterior:
+                continue
+            if metrica in METRICAS_MAYOR_MEJOR:
+                cambio = (anterior - valor) / float(anterior)
+            else:
+                cambio = (valor - anterior) / float(anterior)
+            if cambio > tolerancia:
+                regresiones.append('{} {}: {} -> {} ({:+.0%})'.format(
+                    caso, metrica, anterior, valor, cambio))
+    return regresiones
+
+def guardar(resultados, modo, ruta):
+    """Guarda los resultados y el modo en que se midieron en formato JSON"""
+    with open(ruta, 'w') as f:
+        json.dump({'modo': modo, 'casos': resultados}, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+def main():
+    """Función principal de los benchmarks"""
+    argumentos = argparse.ArgumentParser(description='Benchmarks del runtime BrickScript')
+    argumentos.add_argument('--salida', help='archivo JSON donde guardar los resultados')
+    argumentos.add_argument('--base', default=RUTA_BASE, help='línea base con la que comparar')
+    argumentos.add_argument('--tolerancia', type=float, default=0.25,
+                            help='empeoramiento relativo permitido (0.25 = 25%%)')
+    argumentos.add_argument('--actualizar-base', action='store_true',
+                            help='sobrescribe la línea base con estos resultados')
+    argumentos.add_argument('--rapido', action='store_true', help='menos iteraciones')
+    argumentos.add_argument('--repeticiones', type=int, default=5,
+                            help='veces que se repite cada medida (se conserva la mejor)')
+    opciones = argumentos.parse_args()
+
+    modo = 'rapido' if opciones.rapido else 'completo'
+    resultados = ejecutar(opciones.rapido, max(1, opciones.repeticiones))
+    for caso, metricas in sorted(resultados.items()):
+        print(caso)
+        for metrica, valor in sorted(metricas.items()):
+            print('  {}: {}'.format(metrica, valor))
+
+    if opciones.salida:
+        guardar(resultados, modo, opciones.salida)
+        print('\nResultados guardados en: ' + opciones.salida)
+
+    if opciones.actualizar_base:
+        guardar(resultados, modo, opciones.base)
+        print('\nLínea base actualizada: ' + opciones.base)
+        return
+
+    if not os.path.exists(opciones.base):
+        print('\nNo hay línea base en: ' + opciones.base)
+        return
+
+    base = cargar_json(opciones.base)
+    if base.get('modo') != modo:
+        # Las cargas de trabajo difieren entre modos: no son comparables
+        print('\nLa línea base se midió en modo {}, no en modo {}: '
+              'no se compara.'.format(base.get('modo', 'desconocido'), modo))
+        return
+
+    regresiones = comparar(resultados, base['casos'], opciones.tolerancia)
+    if regresiones:
+        print('\nRegresiones respecto a la línea base:')
+        for regresion in regresiones:
+            print('  ' + regresion)
+        sys.exit(1)
+    print('\nSin regresiones respecto a la línea base.')
+
+if __name__ == '__main__':
+    main()
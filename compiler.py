@@ -1,6 +1,7 @@
 import sys
 import re
 import json
+from array import array
 
 # Compatibilidad Python 2/3
 if sys.version_info[0] >= 3:
@@ -9,6 +10,46 @@ if sys.version_info[0] >= 3:
 # Lista de palabras clave del lenguaje BrickScript
 KEYWORDS = ['String', 'Float', 'Int', 'Bool', 'thing', 'tHing', 'True', 'False']
 
+# Palabras clave de tipo
+TIPOS = ['String', 'Float', 'Int', 'Bool', 'thing', 'tHing']
+
+# Código de array empaquetado para los arrays numéricos
+CODIGOS_ARRAY = {'Int': 'i', 'Float': 'd'}
+
+def nombre_tipo(valor):
+    """Nombre BrickScript del tipo de un valor"""
+    if isinstance(valor, bool):
+        return 'Bool'
+    if isinstance(valor, int):
+        return 'Int'
+    if isinstance(valor, float):
+        return 'Float'
+    if isinstance(valor, (str, unicode)):
+        return 'String'
+    if isinstance(valor, dict):
+        return 'thing'
+    if isinstance(valor, array):
+        # Array empaquetado por un tipo declarado o por empaquetar()
+        for tipo, codigo in CODIGOS_ARRAY.items():
+            if valor.typecode == codigo:
+                return tipo + '[]'
+    return 'array'
+
+def empaquetar(valor):
+    """Empaqueta las listas numéricas homogéneas de un valor sin tipo declarado"""
+    if not isinstance(valor, list):
+        return valor
+    contenido = [empaquetar(elemento) for elemento in valor]
+    tipos = set(nombre_tipo(elemento) for elemento in contenido)
+    if len(tipos) == 1:
+        tipo = tipos.pop()
+        if tipo in CODIGOS_ARRAY:
+            try:
+                return array(CODIGOS_ARRAY[tipo], contenido)
+            except OverflowError:
+                pass
+    return contenido
+
 class Token(object):
     """Representa un token del lenguaje"""
     def __init__(self, tipo, valor):
@@ -101,24 +142,7 @@ class Parser(object):
                 break
             
             # Consumir palabra clave de tipo opcional
-            if token_actual.tipo == 'KEYWORD':
-                self.get_token()  # Consumir KEYWORD
-                
-                # Manejar arrays (Int[], String[], etc.)
-                if self.peek() and self.peek().tipo == 'OPERATOR' and self.peek().valor == '[':
-                    self.get_token()  # Consumir '['
-                    cierre = self.get_token()  # Consumir ']'
-                    if not cierre or cierre.valor != ']':
-                        raise SyntaxError("Error: Se esperaba ']'")
-                
-                # Manejar arrays bidimensionales
-                if self.peek() and self.peek().tipo == 'OPERATOR' and self.peek().valor == '[':
-                    self.get_token()  # Consumir '['
-                    if self.peek() and self.peek().valor == '[':
-                        self.get_token()  # Consumir segundo '['
-                        cierre = self.get_token()  # Consumir ']'
-                        if not cierre or cierre.valor != ']':
-                            raise SyntaxError("Error: Se esperaba ']'")
+            tipo, dimensiones = self.parse_tipo()
             
             # Obtener identificador
             token_key = self.get_token()
@@ -130,8 +154,9 @@ class Parser(object):
             if token_eq.valor != '=':
                 raise SyntaxError('Error: Se esperaba "=", se encontró ' + str(token_eq.valor))
             
-            # Parsear valor
+            # Parsear valor y verificar el tipo declarado
             valor = self.parse_valor()
+            valor = self.verificar_tipo(token_key.valor, tipo, dimensiones, valor)
             
             # Consumir punto y coma opcional
             if self.peek() and self.peek().valor == ';':
@@ -156,6 +181,71 @@ class Parser(object):
             return self.tokens[self.pos]
         return None
     
+    def parse_tipo(self):
+        """Consume el tipo declarado opcional (Int, Float[], Int[][], ...)
+        
+        Devuelve (tipo, dimensiones), o (None, 0) si no se declaró tipo.
+        """
+        token = self.peek()
+        if not token or token.tipo != 'KEYWORD':
+            return None, 0
+        if token.valor not in TIPOS:
+            raise SyntaxError('Error: Se esperaba un tipo, se encontró ' + str(token.valor))
+        self.get_token()
+        
+        # Manejar arrays (Int[], String[], Int[][], etc.)
+        dimensiones = 0
+        while self.peek() and self.peek().tipo == 'OPERATOR' and self.peek().valor == '[':
+            self.get_token()  # Consumir '['
+            cierre = self.get_token()  # Consumir ']'
+            if not cierre or cierre.valor != ']':
+                raise SyntaxError("Error: Se esperaba ']'")
+            dimensiones += 1
+        
+        return token.valor, dimensiones
+    
+    def verificar_tipo(self, nombre, tipo, dimensiones, valor):
+        """Verifica un valor contra su tipo declarado y lo convierte
+        
+        Los Float aceptan enteros, y los arrays Int[] y Float[] se emiten
+        empaquetados como array('i') y array('d'), salvo que algún valor no
+        quepa en el array; entonces quedan como lista.
+        """
+        if tipo is None:
+            return empaquetar(valor)
+        
+        declarado = tipo + '[]' * dimensiones
+        if dimensiones:
+            if isinstance(valor, array):
+                # Array ya empaquetado tomado de la tabla de símbolos
+                codigo = CODIGOS_ARRAY.get(tipo)
+                if dimensiones == 1 and (valor.typecode == codigo or
+                                         (tipo == 'Float' and valor.typecode == 'i')):
+                    return array(codigo, valor)
+                raise TypeError('Error de tipos: "' + nombre + '" es ' + declarado +
+                                ', se encontró ' + nombre_tipo(valor))
+            if not isinstance(valor, list):
+                raise TypeError('Error de tipos: "' + nombre + '" es ' + declarado +
+                                ', se encontró ' + nombre_tipo(valor))
+            contenido = [self.verificar_tipo(nombre, tipo, dimensiones - 1, elemento)
+                         for elemento in valor]
+            if dimensiones == 1 and tipo in CODIGOS_ARRAY:
+                try:
+                    return array(CODIGOS_ARRAY[tipo], contenido)
+                except OverflowError:
+                    # Enteros que no caben en un int de C: lista normal
+                    pass
+            return contenido
+        
+        encontrado = nombre_tipo(valor)
+        if tipo == 'Float' and encontrado == 'Int':
+            return float(valor)
+        if encontrado != tipo and not (tipo == 'tHing' and encontrado == 'thing'):
+            detalle = ' (' + str(valor) + ')' if encontrado in ('Int', 'Float', 'String', 'Bool') else ''
+            raise TypeError('Error de tipos: "' + nombre + '" espera ' + tipo +
+                            ', se encontró ' + encontrado + detalle)
+        return valor
+    
     def parse_valor(self):
         """Parsea un valor (string, número, booleano, array u objeto)"""
         token = self.peek()
@@ -196,15 +286,7 @@ class Parser(object):
         
         while self.peek() and self.peek().valor != '}':
             # Consumir palabra clave de tipo opcional
-            if self.peek().tipo == 'KEYWORD':
-                self.get_token()
-                
-                # Manejar arrays
-                if self.peek() and self.peek().tipo == 'OPERATOR' and self.peek().valor == '[':
-                    self.get_token()  # '['
-                    cierre = self.get_token()  # ']'
-                    if not cierre or cierre.valor != ']':
-                        raise SyntaxError("Error: Se esperaba ']'")
+            tipo, dimensiones = self.parse_tipo()
             
             # Obtener identificador
             token_key = self.get_token()
@@ -216,8 +298,9 @@ class Parser(object):
             if not token_eq or token_eq.valor != '=':
                 raise SyntaxError('Error en bloque: Se esperaba "="')
             
-            # Parsear valor
+            # Parsear valor y verificar el tipo declarado
             valor = self.parse_valor()
+            valor = self.verificar_tipo(token_key.valor, tipo, dimensiones, valor)
             
             # Consumir punto y coma opcional
             if self.peek() and self.peek().valor == ';':
@@ -279,16 +362,22 @@ def cargar_archivo(ruta):
             print('Error: No se pudo leer el archivo: ' + ruta)
             return None
 
+def serializar_array(valor):
+    """Convierte los arrays empaquetados en listas para el JSON"""
+    if isinstance(valor, array):
+        return valor.tolist()
+    raise TypeError('Valor no serializable: ' + repr(valor))
+
 def guardar_json(ast, ruta):
     """Guarda el AST en formato JSON"""
     try:
         with open(ruta, 'w', encoding='utf-8') as f:
-            json.dump(ast, f, indent=2, ensure_ascii=False)
+            json.dump(ast, f, indent=2, ensure_ascii=False, default=serializar_array)
         print('AST guardado en: ' + ruta)
     except:
         # Python 2 fallback
         with open(ruta, 'w') as f:
-            json.dump(ast, f, indent=2, ensure_ascii=False)
+            json.dump(ast, f, indent=2, ensure_ascii=False, default=serializar_array)
         print('AST guardado en: ' + ruta)
 
 def main():
@@ -329,7 +418,7 @@ def main():
         print('\nCompilacion exitosa!')
         print('Archivo generado: ' + archivo_salida)
         
-    except (ValueError, SyntaxError, NameError) as e:
+    except (ValueError, SyntaxError, NameError, TypeError) as e:
         print('\nError: ' + str(e))
         sys.exit(1)
 
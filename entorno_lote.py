@@ -0,0 +1,495 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Entornos por lotes BrickScript con NumPy
+
+Simula N partidas de Snake o Tetris a la vez guardando los tableros como
+arrays apilados y aplicando un vector de acciones por paso. Movimiento,
+colisiones, comida, fijado de piezas, eliminación de líneas y explosiones
+de bombas se calculan con operaciones de arrays sobre todas las partidas. Las reglas son las de
+Juego.paso_snake/Juego.paso_tetris y se leen del mismo JSON (o .brik).
+
+Cada llamada a paso() equivale a una acción seguida de un tick del runtime
+y devuelve (observaciones, recompensas, terminados). Las partidas
+terminadas se reinician automáticamente, así que sus observaciones ya son
+las de la partida nueva.
+
+Requiere numpy.
+"""
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from runtime import Configuracion, Juego
+
+def requerir_numpy():
+    """Verifica que numpy esté disponible"""
+    if np is None:
+        raise ImportError('Error: entorno_lote requiere numpy (pip install numpy)')
+
+class EntornoLoteSnake(object):
+    """N partidas de Snake simuladas en paralelo
+
+    El cuerpo de cada serpiente se guarda como un tablero de vidas: cada
+    celda ocupada indica cuántos pasos le quedan antes de ser la cola que
+    desaparece. Mover la serpiente es restar 1 a todo el tablero y
+    escribir la nueva cabeza con la longitud actual.
+
+    Observaciones: int8 (N, alto, ancho) con 0 vacío, 1 cuerpo, 2 cabeza y
+    3 comida. Recompensa: puntos obtenidos en el paso.
+    """
+
+    # Índice de acción -> control del runtime
+    ACCIONES = ('ninguna', 'moverArriba', 'moverAbajo', 'moverIzquierda', 'moverDerecha')
+
+    # Dirección (dx, dy) de cada acción; (0, 0) mantiene la actual
+    DIRECCIONES = ((0, 0), (0, -1), (0, 1), (-1, 0), (1, 0))
+
+    def __init__(self, datos, n, semilla=None):
+        requerir_numpy()
+        self.config = Configuracion(datos)
+        self.n = n
+        self.ancho = self.config.ancho
+        self.alto = self.config.alto
+        self.aleatorio = np.random.RandomState(semilla)
+        self.indices = np.arange(n)
+
+        self.cuerpo = np.zeros((n, self.alto, self.ancho), dtype=np.int32)
+        self.longitud = np.zeros(n, dtype=np.int32)
+        self.cabeza_x = np.zeros(n, dtype=np.int32)
+        self.cabeza_y = np.zeros(n, dtype=np.int32)
+        self.dir_x = np.zeros(n, dtype=np.int32)
+        self.dir_y = np.zeros(n, dtype=np.int32)
+        self.comida_x = np.zeros(n, dtype=np.int32)
+        self.comida_y = np.zeros(n, dtype=np.int32)
+        self.puntuacion = np.zeros(n, dtype=np.int64)
+
+        self.direcciones = np.array(self.DIRECCIONES, dtype=np.int32)
+
+    def reiniciar(self, mascara=None):
+        """Reinicia las partidas indicadas (todas por defecto)"""
+        if mascara is None:
+            mascara = np.ones(self.n, dtype=bool)
+        indices = np.flatnonzero(mascara)
+        if len(indices) == 0:
+            return self.observar()
+
+        config = self.config
+        self.cuerpo[indices] = 0
+        self.longitud[indices] = config.snake_longitud
+        self.cabeza_x[indices] = config.snake_x
+        self.cabeza_y[indices] = config.snake_y
+        self.dir_x[indices] = 1
+        self.dir_y[indices] = 0
+        self.puntuacion[indices] = 0
+
+        # Segmentos iniciales hacia la izquierda de la cabeza; los que caen
+        # fuera del tablero no ocupan celda, igual que en el runtime
+        for i in range(config.snake_longitud):
+            x = config.snake_x - i
+            if 0 <= x < self.ancho and 0 <= config.snake_y < self.alto:
+                self.cuerpo[indices, config.snake_y, x] = config.snake_longitud - i
+
+        self.generar_comida(indices)
+        return self.observar()
+
+    def generar_comida(self, indices):
+        """Coloca comida en una celda libre aleatoria de cada partida"""
+        libres = self.cuerpo[indices].reshape(len(indices), -1) == 0
+        azar = self.aleatorio.random_sample(libres.shape)
+        azar[~libres] = -1.0
+        celda = azar.argmax(axis=1)
+        self.comida_y[indices] = celda // self.ancho
+        self.comida_x[indices] = celda % self.ancho
+
+    def paso(self, acciones):
+        """Aplica una acción por partida y avanza un tick"""
+        acciones = np.asarray(acciones, dtype=np.int64)
+        config = self.config
+
+        # Cambio de dirección sin permitir invertir el sentido
+        dx = self.direcciones[acciones, 0]
+        dy = self.direcciones[acciones, 1]
+        gira = ((dx != 0) & (self.dir_x != -dx)) | ((dy != 0) & (self.dir_y != -dy))
+        self.dir_x = np.where(gira, dx, self.dir_x)
+        self.dir_y = np.where(gira, dy, self.dir_y)
+
+        nuevo_x = self.cabeza_x + self.dir_x
+        nuevo_y = self.cabeza_y + self.dir_y
+
+        # Colisión con bordes o paso al lado opuesto
+        if config.chocar_con_borde:
+            terminados = ((nuevo_x < 0) | (nuevo_x >= self.ancho) |
+                          (nuevo_y < 0) | (nuevo_y >= self.alto))
+            nuevo_x = np.clip(nuevo_x, 0, self.ancho - 1)
+            nuevo_y = np.clip(nuevo_y, 0, self.alto - 1)
+        else:
+            terminados = np.zeros(self.n, dtype=bool)
+            nuevo_x = nuevo_x % self.ancho
+            nuevo_y = nuevo_y % self.alto
+
+        # Colisión consigo misma (la cola aún cuenta como ocupada)
+        if config.chocar_consigo_mismo:
+            terminados |= self.cuerpo[self.indices, nuevo_y, nuevo_x] > 0
+
+        vivos = ~terminados
+        come = vivos & (nuevo_x == self.comida_x) & (nuevo_y == self.comida_y)
+
+        # Sin comer la cola avanza; comiendo la serpiente crece una celda
+        avanza = vivos & ~come
+        self.cuerpo[avanza] = np.maximum(self.cuerpo[avanza] - 1, 0)
+        self.longitud[come] += 1
+
+        indices = np.flatnonzero(vivos)
+        self.cuerpo[indices, nuevo_y[indices], nuevo_x[indices]] = self.longitud[indices]
+        self.cabeza_x[indices] = nuevo_x[indices]
+        self.cabeza_y[indices] = nuevo_y[indices]
+
+        recompensas = np.where(come, config.puntos_comida, 0).astype(np.float32)
+        self.puntuacion += recompensas.astype(np.int64)
+        if come.any():
+            self.generar_comida(np.flatnonzero(come))
+
+        observaciones = self.reiniciar(terminados)
+        return observaciones, recompensas, terminados
+
+    def observar(self):
+        """Tableros de observación de todas las partidas"""
+        observaciones = np.zeros((self.n, self.alto, self.ancho), dtype=np.int8)
+        observaciones[self.indices, self.comida_y, self.comida_x] = 3
+        observaciones[self.cuerpo > 0] = 1
+        observaciones[self.indices, self.cabeza_y, self.cabeza_x] = 2
+        return observaciones
+
+class EntornoLoteTetris(object):
+    """N partidas de Tetris simuladas en paralelo
+
+    Los tableros se guardan en un array (N, alto + M, ancho + 2M) con
+    paredes de M celdas a los lados y debajo, de forma que la ventana
+    MxM de cualquier posición candidata de la pieza se puede leer sin
+    comprobar bordes. Las figuras se precalculan como máscaras por
+    rotación.
+
+    Con reglaBombaLadrillo la figura bomba se añade como una figura más
+    que aparece con ProbabilidadBomba. Las celdas de bomba valen 3 en el
+    tablero (1 | 2: el bit bajo sigue marcando la celda como ocupada) y un segundo
+    array guarda el tick en que explota cada una; la reacción en cadena
+    se calcula expandiendo las bombas que explotan con la máscara de
+    explosión hasta que no alcanzan ninguna bomba nueva.
+
+    Observaciones: int8 (N, alto, ancho) con 0 vacío, 1 bloque fijo,
+    2 pieza actual y 3 bomba fija. Recompensa: puntos por líneas
+    eliminadas en el paso.
+    """
+
+    # Índice de acción -> control del runtime
+    ACCIONES = ('ninguna', 'moverIzquierda', 'moverDerecha', 'acelerarAbajo',
+                'evitarCaida', 'caidaInmediata')
+
+    def __init__(self, datos, n, semilla=None):
+        requerir_numpy()
+        self.config = Configuracion(datos)
+        self.n = n
+        self.ancho = self.config.ancho
+        self.alto = self.config.alto
+        self.aleatorio = np.random.RandomState(semilla)
+        self.indices = np.arange(n)
+
+        # La bomba es la última figura y solo sale con ProbabilidadBomba
+        figuras = list(self.config.tetris_figuras)
+        self.figuras_normales = len(figuras)
+        self.figura_bomba = None
+        if self.config.bomba_probabilidad > 0:
+            self.figura_bomba = len(figuras)
+            figuras.append(self.config.bomba_figura)
+        self.preparar_figuras(figuras)
+
+        # Margen de pared: cubre la ventana de la pieza y el origen de
+        # aparición (ancho // 2 - 2) en tableros estrechos
+        m = self.lado + 2
+        self.margen = m
+        self.tablero = np.zeros((n, self.alto + m, self.ancho + 2 * m), dtype=np.uint8)
+        self.tablero[:, :, :m] = 1
+        self.tablero[:, :, m + self.ancho:] = 1
+        self.tablero[:, self.alto:, :] = 1
+
+        # Tick de explosión de cada celda con bomba (0 = sin bomba), tick
+        # de caída de cada partida y primera explosión pendiente (0 =
+        # ninguna), para no revisar cada tick los tableros sin bombas
+        self.bombas = np.zeros(self.tablero.shape, dtype=np.int64)
+        self.tick = np.zeros(n, dtype=np.int64)
+        self.proxima_explosion = np.zeros(n, dtype=np.int64)
+        self.explosion = [(dy, dx) for dy, semiancho in self.config.bomba_mascara
+                          for dx in range(-semiancho, semiancho + 1)]
+
+        self.figura = np.zeros(n, dtype=np.int64)
+        self.rotacion = np.zeros(n, dtype=np.int64)
+        self.pieza_x = np.zeros(n, dtype=np.int64)
+        self.pieza_y = np.zeros(n, dtype=np.int64)
+        self.puntuacion = np.zeros(n, dtype=np.int64)
+
+        self.desplazamiento = np.arange(self.lado)
+        self.puntos_lineas = np.array(Juego.TETRIS_SCORE_VALUES, dtype=np.int64)
+
+    def preparar_figuras(self, figuras):
+        """Precalcula las máscaras (figura, rotación, fila, columna)"""
+        rotaciones = [len(figura['patron']) for figura in figuras]
+        lado = 1
+        for patrones in (figura['patron'] for figura in figuras):
+            for patron in patrones:
+                lado = max(lado, len(patron), max([len(fila) for fila in patron] + [0]))
+
+        # Número de rotaciones común a todas las figuras (mínimo común
+        # múltiplo) para que rotacion % total equivalga a la del runtime
+        total = 1
+        for r in rotaciones:
+            a, b = total, r
+            while b:
+                a, b = b, a % b
+            total = total * r // a
+
+        self.lado = lado
+        self.total_rotaciones = total
+        self.mascaras = np.zeros((len(figuras), total, lado, lado), dtype=np.uint8)
+        for f, figura in enumerate(figuras):
+            for r in range(total):
+                patron = figura['patron'][r % rotaciones[f]]
+                for i, fila in enumerate(patron):
+                    for j, celda in enumerate(fila):
+                        if celda:
+                            self.mascaras[f, r, i, j] = 1
+
+    def ventana(self, indices, x, y):
+        """Índices (partida, fila, columna) de la ventana de la pieza"""
+        filas = (y[:, None] + self.desplazamiento)[:, :, None]
+        columnas = (x[:, None] + self.margen + self.desplazamiento)[:, None, :]
+        return indices[:, None, None], filas, columnas
+
+    def dentro(self, filas, columnas):
+        """Indica qué celdas de una ventana caen dentro del tablero"""
+        m = self.margen
+        return (filas < self.alto) & (columnas >= m) & (columnas < m + self.ancho)
+
+    def mascara(self, indices, rotacion):
+        """Máscara de la pieza actual de las partidas indicadas"""
+        return self.mascaras[self.figura[indices], rotacion % self.total_rotaciones]
+
+    def colision(self, indices, x, y, rotacion):
+        """Indica qué partidas chocan con la pieza en la posición dada"""
+        celdas = self.tablero[self.ventana(indices, x, y)]
+        return (celdas & self.mascara(indices, rotacion)).any(axis=(1, 2))
+
+    def nuevas_piezas(self, indices):
+        """Genera pieza nueva; devuelve la máscara de partidas que pierden"""
+        figuras = self.aleatorio.randint(0, self.figuras_normales, size=len(indices))
+        if self.figura_bomba is not None:
+            bombas = self.aleatorio.random_sample(len(indices)) < self.config.bomba_probabilidad
+            figuras[bombas] = self.figura_bomba
+        self.figura[indices] = figuras
+        self.rotacion[indices] = 0
+        self.pieza_x[indices] = self.ancho // 2 - 2
+        self.pieza_y[indices] = 0
+        return self.colision(indices, self.pieza_x[indices], self.pieza_y[indices],
+                             self.rotacion[indices])
+
+    def reiniciar(self, mascara=None):
+        """Reinicia las partidas indicadas (todas por defecto)"""
+        if mascara is None:
+            mascara = np.ones(self.n, dtype=bool)
+        indices = np.flatnonzero(mascara)
+        if len(indices):
+            m = self.margen
+            self.tablero[indices, :self.alto, m:m + self.ancho] = 0
+            if self.figura_bomba is not None:
+                self.bombas[indices] = 0
+                self.proxima_explosion[indices] = 0
+            self.tick[indices] = 0
+            self.puntuacion[indices] = 0
+            self.nuevas_piezas(indices)
+        return self.observar()
+
+    def mover(self, indices, dx=0, dy=0, drot=0):
+        """Aplica un movimiento y lo deshace en las partidas que chocan"""
+        if len(indices) == 0:
+            return
+        x = self.pieza_x[indices] + dx
+        y = self.pieza_y[indices] + dy
+        rotacion = self.rotacion[indices] + drot
+        libres = ~self.colision(indices, x, y, rotacion)
+        validos = indices[libres]
+        self.pieza_x[validos] = x[libres]
+        self.pieza_y[validos] = y[libres]
+        self.rotacion[validos] = rotacion[libres]
+
+    def distancia_caida(self, indices):
+        """Filas que puede bajar la pieza de cada partida indicada"""
+        distancia = np.zeros(len(indices), dtype=np.int64)
+        activas = np.arange(len(indices))
+        x = self.pieza_x[indices]
+        rotacion = self.rotacion[indices]
+        while len(activas):
+            y = self.pieza_y[indices[activas]] + distancia[activas] + 1
+            libres = ~self.colision(indices[activas], x[activas], y, rotacion[activas])
+            activas = activas[libres]
+            distancia[activas] += 1
+        return distancia
+
+    def bloquear(self, indices):
+        """Fija piezas, elimina líneas y genera las siguientes
+
+        Devuelve (puntos, perdidas) para las partidas indicadas.
+        """
+        # Fijar la pieza en el tablero
+        celdas = self.ventana(indices, self.pieza_x[indices], self.pieza_y[indices])
+        mascara = self.mascara(indices, self.rotacion[indices])
+        self.tablero[celdas] |= mascara
+
+        # Las bombas explotan tiempoExplosion ticks de caída después
+        if self.figura_bomba is not None:
+            bomba = self.figura[indices] == self.figura_bomba
+            if bomba.any():
+                partidas, filas, columnas = celdas
+                celdas = partidas[bomba], filas[bomba], columnas[bomba]
+                explosion = self.tick[indices[bomba]] + self.config.bomba_tiempo
+                con_bomba = mascara[bomba].astype(bool) & self.dentro(celdas[1], celdas[2])
+                self.tablero[celdas] |= con_bomba.astype(np.uint8) * 2
+                self.bombas[celdas] = np.where(con_bomba, explosion[:, None, None],
+                                               self.bombas[celdas])
+                proxima = self.proxima_explosion[indices[bomba]]
+                self.proxima_explosion[indices[bomba]] = np.where(
+                    proxima > 0, np.minimum(proxima, explosion), explosion)
+
+        return self.eliminar_lineas(indices), self.nuevas_piezas(indices)
+
+    def eliminar_lineas(self, indices):
+        """Elimina líneas completas y devuelve los puntos de cada partida"""
+        # Las filas llenas pasan arriba (orden estable) y se vacían, el
+        # resto conserva su orden abajo; las bombas se mueven con su fila
+        m = self.margen
+        llenas = self.tablero[indices, :self.alto, m:m + self.ancho].all(axis=2)
+        eliminadas = llenas.sum(axis=1)
+        if eliminadas.any():
+            orden = np.argsort(~llenas, axis=1, kind='stable')
+            vaciar = np.arange(self.alto)[None, :] < eliminadas[:, None]
+            capas = (self.tablero,) if self.figura_bomba is None else (self.tablero, self.bombas)
+            for capa in capas:
+                campo = capa[indices, :self.alto, m:m + self.ancho]
+                campo = campo[np.arange(len(indices))[:, None], orden]
+                campo[vaciar] = 0
+                capa[indices, :self.alto, m:m + self.ancho] = campo
+        return self.puntos_lineas[np.minimum(eliminadas, 4)]
+
+    def detonar(self, indices):
+        """Explota las bombas que cumplen su tiempo, en cadena, y aplica gravedad
+
+        Devuelve los puntos por las líneas que completa la gravedad en
+        cada partida indicada.
+        """
+        puntos = np.zeros(len(indices), dtype=np.int64)
+        proxima = self.proxima_explosion[indices]
+        detonan = (proxima > 0) & (proxima <= self.tick[indices])
+        if not detonan.any():
+            return puntos
+        indices = indices[detonan]
+
+        # La explosión pendiente puede ser de una bomba ya eliminada con
+        # su línea: solo explotan las bombas que siguen en el tablero
+        m = self.margen
+        alto, ancho = self.alto, self.ancho
+        bombas = self.bombas[indices, :alto, m:m + ancho]
+        explotan = (bombas > 0) & (bombas <= self.tick[indices][:, None, None])
+
+        # Reacción en cadena: las bombas dentro de la zona destruida
+        # también explotan, hasta que la zona deja de crecer
+        r = self.config.bomba_radio
+        while True:
+            zona = np.zeros((len(indices), alto + 2 * r, ancho + 2 * r), dtype=bool)
+            for dy, dx in self.explosion:
+                zona[:, r + dy:r + dy + alto, r + dx:r + dx + ancho] |= explotan
+            destruidas = zona[:, r:r + alto, r:r + ancho]
+            cadena = explotan | ((bombas > 0) & destruidas)
+            if (cadena == explotan).all():
+                break
+            explotan = cadena
+
+        # Gravedad por columnas: cada celda que queda baja tantas filas
+        # como celdas destruidas tenga debajo en su columna
+        campo = self.tablero[indices, :alto, m:m + ancho]
+        debajo = np.cumsum(destruidas[:, ::-1], axis=1)[:, ::-1] - destruidas
+        partida, fila, columna = np.nonzero(campo.astype(bool) & ~destruidas)
+        destino = fila + debajo[partida, fila, columna]
+        tablero = np.zeros((len(indices), alto, ancho), dtype=self.tablero.dtype)
+        tablero[partida, destino, columna] = campo[partida, fila, columna]
+        nuevas_bombas = np.zeros((len(indices), alto, ancho), dtype=self.bombas.dtype)
+        nuevas_bombas[partida, destino, columna] = bombas[partida, fila, columna]
+        self.tablero[indices, :alto, m:m + ancho] = tablero
+        self.bombas[indices, :alto, m:m + ancho] = nuevas_bombas
+
+        # Siguiente explosión pendiente entre las bombas que quedan
+        pendientes = np.where(nuevas_bombas > 0, nuevas_bombas, np.iinfo(np.int64).max)
+        proxima = pendientes.min(axis=(1, 2))
+        self.proxima_explosion[indices] = np.where(nuevas_bombas.any(axis=(1, 2)), proxima, 0)
+
+        # La gravedad puede completar líneas
+        puntos[detonan] = self.eliminar_lineas(indices)
+        return puntos
+
+    def paso(self, acciones):
+        """Aplica una acción por partida y avanza un tick"""
+        acciones = np.asarray(acciones, dtype=np.int64)
+        recompensas = np.zeros(self.n, dtype=np.int64)
+        terminados = np.zeros(self.n, dtype=bool)
+
+        # Controles
+        self.mover(np.flatnonzero(acciones == 1), dx=-1)
+        self.mover(np.flatnonzero(acciones == 2), dx=1)
+        self.mover(np.flatnonzero(acciones == 3), dy=1)
+        self.mover(np.flatnonzero(acciones == 4), drot=1)
+
+        caen = np.flatnonzero(acciones == 5)
+        if len(caen):
+            self.pieza_y[caen] += self.distancia_caida(caen)
+            puntos, perdidas = self.bloquear(caen)
+            recompensas[caen] += puntos
+            terminados[caen] = perdidas
+
+        # Gravedad: bajar una fila o fijar la pieza si está apoyada
+        vivos = np.flatnonzero(~terminados)
+        self.tick[vivos] += 1
+        apoyadas = self.colision(vivos, self.pieza_x[vivos], self.pieza_y[vivos] + 1,
+                                 self.rotacion[vivos])
+        self.pieza_y[vivos[~apoyadas]] += 1
+        fijar = vivos[apoyadas]
+        if len(fijar):
+            puntos, perdidas = self.bloquear(fijar)
+            recompensas[fijar] += puntos
+            terminados[fijar] = perdidas
+
+        # Explotar las bombas cuyo temporizador termina en este tick
+        if self.figura_bomba is not None and len(vivos):
+            recompensas[vivos] += self.detonar(vivos)
+
+        self.puntuacion += recompensas
+        observaciones = self.reiniciar(terminados)
+        return observaciones, recompensas.astype(np.float32), terminados
+
+    def observar(self):
+        """Tableros de observación de todas las partidas"""
+        tableros = self.tablero.astype(np.int8)
+        celdas = self.ventana(self.indices, self.pieza_x, self.pieza_y)
+        mascara = self.mascara(self.indices, self.rotacion).astype(bool)
+        tableros[celdas] = np.where(mascara, 2, tableros[celdas])
+        m = self.margen
+        return tableros[:, :self.alto, m:m + self.ancho]
+
+def crear_entorno_lote(datos, n, semilla=None):
+    """Crea el entorno por lotes adecuado para la configuración del juego"""
+    tipo_juego = Configuracion(datos).tipo_juego
+    if tipo_juego == 'snake':
+        return EntornoLoteSnake(datos, n, semilla)
+    if tipo_juego == 'tetris':
+        return EntornoLoteTetris(datos, n, semilla)
+    raise ValueError('Error: no hay entorno por lotes para el juego "' +
+                     datos.get('nombreJuego', '') + '"')
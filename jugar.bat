@@ -27,20 +27,7 @@ echo BrickScript - Compilando y ejecutando
 echo ========================================
 echo.
 
-REM Compilar el archivo .brik a .json
-echo Compilando %juego%.brik...
-python compiler.py ejemplos\%juego%.brik
-
-if %errorlevel% neq 0 (
-    echo.
-    echo Error en la compilacion
-    pause
-    goto :eof
-)
-
-echo.
-echo Ejecutando %juego%.json...
-echo.
-python runtime.py ejemplos\%juego%.json
+REM El runtime compila el archivo .brik en memoria y ejecuta el juego
+python runtime.py ejemplos\%juego%.brik
 
 pause
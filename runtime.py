@@ -11,10 +11,15 @@ import json
 import time
 import os
 import random
+import bisect
+import math
+from collections import deque
 
 # Compatibilidad Python 2/3
 if sys.version_info[0] >= 3:
     unicode = str
+    # En Python 2 file.write no acepta memoryview, pero sí buffer
+    buffer = memoryview
 
 # Intentar importar módulos para input de teclado
 try:
@@ -34,38 +39,240 @@ except ImportError:
             return sys.stdin.read(1).lower()
         return None
 
+class Configuracion(object):
+    """Configuración del juego compilada una sola vez desde el JSON
+    
+    Valida los campos numéricos al cargar y precalcula la tabla
+    tecla -> acción y el texto de la leyenda de controles, para que el
+    loop principal no tenga que consultar el diccionario original.
+    """
+    
+    __slots__ = (
+        'nombre', 'tipo_juego', 'ancho', 'alto', 'vista_ancho', 'vista_alto',
+        'snake_x', 'snake_y', 'snake_longitud', 'snake_velocidad',
+        'chocar_con_borde', 'chocar_consigo_mismo', 'puntos_comida',
+        'tetris_velocidad', 'tetris_figuras',
+        'bomba_figura', 'bomba_probabilidad', 'bomba_radio', 'bomba_tiempo', 'bomba_mascara',
+        'acciones', 'leyenda'
+    )
+    
+    # Controles de cada tipo de juego: (clave, etiqueta, tecla por defecto)
+    CONTROLES_SNAKE = (
+        ('moverArriba', 'Arriba', 'w'),
+        ('moverAbajo', 'Abajo', 's'),
+        ('moverIzquierda', 'Izquierda', 'a'),
+        ('moverDerecha', 'Derecha', 'd'),
+    )
+    # Etiquetas con acentos como unicode para poder unirlas en Python 2
+    CONTROLES_TETRIS = (
+        ('moverIzquierda', 'Izquierda', 'a'),
+        ('moverDerecha', 'Derecha', 'd'),
+        ('acelerarAbajo', u'Acelerar caída', 's'),
+        ('evitarCaida', 'Rotar pieza', 'w'),
+        ('caidaInmediata', u'Caída inmediata', 'x'),
+    )
+    CONTROLES_ESTADO = (
+        ('pausar', 'Pausar', 'p'),
+        ('reiniciar', 'Reiniciar', 'r'),
+    )
+    
+    # Tamaño máximo por defecto de la ventana visible del tablero
+    VISTA_MAX_ANCHO = 60
+    VISTA_MAX_ALTO = 30
+    
+    def __init__(self, datos):
+        self.nombre = datos.get('nombreJuego', 'BrickScript Game')
+        if not isinstance(self.nombre, (str, unicode)):
+            raise ValueError('Error de configuración: "nombreJuego" debe ser un texto')
+        self.ancho = self.leer_numero(datos, 'anchoTablero', 20, entero=True, minimo=1)
+        self.alto = self.leer_numero(datos, 'altoTablero', 20, entero=True, minimo=1)
+        
+        # Ventana visible: en tableros grandes solo se dibuja esta zona
+        vista_ancho = self.leer_numero(datos, 'anchoVista', self.VISTA_MAX_ANCHO, entero=True, minimo=1)
+        vista_alto = self.leer_numero(datos, 'altoVista', self.VISTA_MAX_ALTO, entero=True, minimo=1)
+        self.vista_ancho = min(self.ancho, vista_ancho)
+        self.vista_alto = min(self.alto, vista_alto)
+        
+        # Detectar tipo de juego
+        nombre_minusc = self.nombre.lower()
+        if 'snake' in nombre_minusc:
+            self.tipo_juego = 'snake'
+        elif 'tetris' in nombre_minusc:
+            self.tipo_juego = 'tetris'
+        else:
+            self.tipo_juego = 'generico'
+        
+        # Snake
+        serpiente = datos.get('serpiente', {})
+        self.snake_x = self.leer_numero(serpiente, 'posXInicial', self.ancho // 2, entero=True)
+        self.snake_y = self.leer_numero(serpiente, 'posYInicial', self.alto // 2, entero=True)
+        self.snake_longitud = self.leer_numero(serpiente, 'longitudInicial', 3, entero=True, minimo=1)
+        self.snake_velocidad = self.leer_numero(serpiente, 'velocidad', 5.0, minimo=0.001)
+        
+        reglas = datos.get('reglasJuego', {})
+        self.chocar_con_borde = bool(reglas.get('chocarConBorde', True))
+        self.chocar_consigo_mismo = bool(reglas.get('chocarConsigoMismo', True))
+        
+        comida = datos.get('comida', {})
+        self.puntos_comida = self.leer_numero(comida, 'puntos', 10, entero=True)
+        
+        # Tetris
+        self.tetris_velocidad = self.leer_numero(datos, 'velocidadInicial', 1.0, minimo=0.001)
+        self.tetris_figuras = []
+        
+        # Bombas: con reglaBombaLadrillo la figura cuyo nombre contiene
+        # "bomba" deja de salir como pieza normal
+        regla_bomba = datos.get('reglaBombaLadrillo')
+        self.bomba_figura = None
+        
+        for key in datos.keys():
+            if key.startswith('figura'):
+                figura = datos.get(key, {})
+                if 'patron' in figura:
+                    if not isinstance(figura['patron'], list) or not figura['patron']:
+                        raise ValueError('Error de configuración: "' + key + '.patron" debe ser una lista no vacía')
+                    if regla_bomba is not None and 'bomba' in key.lower():
+                        self.bomba_figura = figura
+                    else:
+                        self.tetris_figuras.append(figura)
+        
+        # Si no hay figuras, crear una básica
+        if not self.tetris_figuras:
+            self.tetris_figuras = [{
+                'color': 'cyan',
+                'patron': [[[1, 1, 1, 1]]]
+            }]
+        
+        if regla_bomba is None:
+            self.bomba_probabilidad = 0.0
+            self.bomba_radio = 0
+            self.bomba_tiempo = 1
+        else:
+            if self.bomba_figura is None:
+                self.bomba_figura = {
+                    'color': regla_bomba.get('color', 'rojo'),
+                    'patron': [[[1]]]
+                }
+            aparicion = datos.get('ReglaAparicionPiezas', {})
+            self.bomba_probabilidad = self.leer_numero(aparicion, 'ProbabilidadBomba', 0.0,
+                                                       minimo=0, maximo=1)
+            if not aparicion.get('aparicionAleatoria', True):
+                self.bomba_probabilidad = 0.0
+            self.bomba_radio = self.leer_numero(regla_bomba, 'radioDestruccion', 1, entero=True, minimo=0)
+            self.bomba_tiempo = self.leer_numero(regla_bomba, 'tiempoExplosion', 1, entero=True, minimo=1)
+        
+        # Máscara de explosión por filas: (desplazamiento vertical, semiancho)
+        # del círculo de radio bomba_radio centrado en la bomba
+        self.bomba_mascara = tuple(
+            (dy, int(math.sqrt(self.bomba_radio * self.bomba_radio - dy * dy)))
+            for dy in range(-self.bomba_radio, self.bomba_radio + 1)
+        )
+        
+        # Tabla tecla -> acción y leyenda de controles
+        controles = datos.get('controles', {})
+        if self.tipo_juego == 'snake':
+            movimiento = self.CONTROLES_SNAKE
+        elif self.tipo_juego == 'tetris':
+            movimiento = self.CONTROLES_TETRIS
+        else:
+            movimiento = ()
+        
+        # Misma prioridad que la cadena if/elif original: controles de
+        # estado primero y después los de movimiento; la primera acción
+        # asignada a una tecla es la que gana
+        self.acciones = {}
+        for clave, etiqueta, defecto in self.CONTROLES_ESTADO + movimiento:
+            self.acciones.setdefault(controles.get(clave, defecto), clave)
+        
+        lineas = []
+        if controles:
+            lineas.append('\nControles:')
+            # Mismo orden que la leyenda original, sin repetir izquierda/derecha
+            for clave, etiqueta, defecto in (self.CONTROLES_SNAKE + self.CONTROLES_TETRIS[2:] +
+                                             self.CONTROLES_ESTADO):
+                if clave in controles:
+                    lineas.append('  ' + etiqueta + ': ' + controles[clave])
+        self.leyenda = '\n'.join(lineas)
+    
+    def leer_numero(self, seccion, clave, defecto, entero=False, minimo=None, maximo=None):
+        """Lee y valida un campo numérico de la configuración"""
+        valor = seccion.get(clave, defecto)
+        tipos = (int,) if entero else (int, float)
+        if isinstance(valor, bool) or not isinstance(valor, tipos):
+            tipo = 'entero' if entero else 'numérico'
+            raise ValueError('Error de configuración: "' + clave + '" debe ser ' + tipo)
+        if minimo is not None and valor < minimo:
+            raise ValueError('Error de configuración: "' + clave + '" debe ser al menos ' + str(minimo))
+        if maximo is not None and valor > maximo:
+            raise ValueError('Error de configuración: "' + clave + '" debe ser como máximo ' + str(maximo))
+        return valor
+
 class Juego(object):
     """Motor de juego básico para BrickScript"""
     
     # Constantes para puntuación de Tetris
     TETRIS_SCORE_VALUES = [0, 100, 300, 500, 800]
     
-    def __init__(self, datos_json):
+    # Símbolos de las celdas del grid (un byte por celda)
+    CELDA_VACIA = ord(' ')
+    CELDA_COMIDA = ord('*')
+    CELDA_CABEZA = ord('O')
+    CELDA_CUERPO = ord('o')
+    CELDA_BLOQUE = ord('#')
+    CELDA_FANTASMA = ord('.')
+    CELDA_BOMBA = ord('@')
+    
+    def __init__(self, datos_json, salida=None):
         self.datos = datos_json
-        self.nombre = datos_json.get('nombreJuego', 'BrickScript Game')
-        self.ancho = datos_json.get('anchoTablero', 20)
-        self.alto = datos_json.get('altoTablero', 20)
+        self.config = Configuracion(datos_json)
+        self.nombre = self.config.nombre
+        self.ancho = self.config.ancho
+        self.alto = self.config.alto
+        self.vista_ancho = self.config.vista_ancho
+        self.vista_alto = self.config.vista_alto
         self.puntuacion = 0
         self.jugando = True
         
-        # Inicializar grid
-        self.grid = []
-        for i in range(self.alto):
-            fila = []
-            for j in range(self.ancho):
-                fila.append(' ')
-            self.grid.append(fila)
-        
-        # Detectar tipo de juego e inicializar
-        nombre_minusc = self.nombre.lower()
-        if 'snake' in nombre_minusc:
-            self.tipo_juego = 'snake'
+        # Salida binaria con buffer para escribir las filas sin copiarlas
+        if salida is None:
+            salida = getattr(sys.stdout, 'buffer', sys.stdout)
+        self.salida = salida
+        
+        # Textos fijos del renderizado, codificados una sola vez
+        separador = ('=' * (self.vista_ancho + 2) + '\n').encode('utf-8')
+        borde = ('+' + '-' * self.vista_ancho + '+\n').encode('utf-8')
+        self.texto_cabecera = separador + ('  ' + self.nombre + '\n').encode('utf-8')
+        self.texto_tablero = separador + borde
+        self.texto_pie = borde
+        if self.config.leyenda:
+            self.texto_pie += (self.config.leyenda + '\n').encode('utf-8')
+        self.texto_pie += '\nPresiona Ctrl+C para salir\n'.encode('utf-8')
+        
+        # Inicializar grid (solo la ventana visible del tablero)
+        self.crear_grid()
+        
+        # Inicializar según el tipo de juego
+        self.tipo_juego = self.config.tipo_juego
+        if self.tipo_juego == 'snake':
             self.inicializar_snake()
-        elif 'tetris' in nombre_minusc:
-            self.tipo_juego = 'tetris'
+        elif self.tipo_juego == 'tetris':
             self.inicializar_tetris()
-        else:
-            self.tipo_juego = 'generico'
+    
+    def crear_grid(self):
+        """Crea el grid de la ventana visible y la sitúa en el origen
+        
+        El grid es un único bytearray contiguo de vista_alto filas de
+        vista_ancho bytes, una celda por byte.
+        """
+        self.vista_x = 0
+        self.vista_y = 0
+        self.grid_vacio = b' ' * (self.vista_ancho * self.vista_alto)
+        self.grid = bytearray(self.grid_vacio)
+    
+    def centrar_vista(self, x, y):
+        """Desplaza la ventana visible para seguir la posición (x, y)"""
+        self.vista_x = max(0, min(x - self.vista_ancho // 2, self.ancho - self.vista_ancho))
+        self.vista_y = max(0, min(y - self.vista_alto // 2, self.alto - self.vista_alto))
     
     def limpiar_pantalla(self):
         """Limpia la pantalla de consola"""
@@ -75,55 +282,44 @@ class Juego(object):
         """Dibuja el juego en consola"""
         self.limpiar_pantalla()
         
-        print('=' * (self.ancho + 2))
-        print('  ' + self.nombre)
-        print('  Puntuacion: ' + str(self.puntuacion))
-        print('=' * (self.ancho + 2))
-        
-        # Dibujar borde superior
-        print('+' + '-' * self.ancho + '+')
-        
-        # Dibujar grid
-        for fila in self.grid:
-            print('|' + ''.join(fila) + '|')
-        
-        # Dibujar borde inferior
-        print('+' + '-' * self.ancho + '+')
-        
-        # Instrucciones
-        controles = self.datos.get('controles', {})
-        if controles:
-            print('\nControles:')
-            if 'moverArriba' in controles:
-                print('  Arriba: ' + controles.get('moverArriba', 'w'))
-            if 'moverAbajo' in controles:
-                print('  Abajo: ' + controles.get('moverAbajo', 's'))
-            if 'moverIzquierda' in controles:
-                print('  Izquierda: ' + controles.get('moverIzquierda', 'a'))
-            if 'moverDerecha' in controles:
-                print('  Derecha: ' + controles.get('moverDerecha', 'd'))
-            if 'acelerarAbajo' in controles:
-                print('  Acelerar caída: ' + controles.get('acelerarAbajo', 's'))
-            if 'evitarCaida' in controles:
-                print('  Rotar pieza: ' + controles.get('evitarCaida', 'w'))
-            if 'pausar' in controles:
-                print('  Pausar: ' + controles.get('pausar', 'p'))
-            if 'reiniciar' in controles:
-                print('  Reiniciar: ' + controles.get('reiniciar', 'r'))
-        
-        print('\nPresiona Ctrl+C para salir')
+        # Vaciar lo que quede en la capa de texto antes de usar la binaria
+        sys.stdout.flush()
+        salida = self.salida
+        
+        salida.write(self.texto_cabecera)
+        salida.write(('  Puntuacion: ' + str(self.puntuacion) + '\n').encode('utf-8'))
+        if self.vista_ancho < self.ancho or self.vista_alto < self.alto:
+            salida.write('  Vista: ({}, {}) de {}x{}\n'.format(self.vista_x, self.vista_y,
+                                                               self.ancho, self.alto).encode('utf-8'))
+        
+        # Separador y borde superior
+        salida.write(self.texto_tablero)
+        
+        # Dibujar grid: cada fila se escribe como una vista del bytearray
+        vista = buffer(self.grid)
+        for inicio in range(0, len(self.grid), self.vista_ancho):
+            salida.write(b'|')
+            salida.write(vista[inicio:inicio + self.vista_ancho])
+            salida.write(b'|\n')
+        
+        # Borde inferior e instrucciones
+        salida.write(self.texto_pie)
+        salida.flush()
     
     def inicializar_snake(self):
         """Inicializa el juego Snake"""
-        serpiente_config = self.datos.get('serpiente', {})
-        self.snake_x = serpiente_config.get('posXInicial', self.ancho // 2)
-        self.snake_y = serpiente_config.get('posYInicial', self.alto // 2)
-        longitud = serpiente_config.get('longitudInicial', 3)
-        
-        # Cuerpo de la serpiente (lista de [x, y])
-        self.snake_cuerpo = []
+        self.snake_x = self.config.snake_x
+        self.snake_y = self.config.snake_y
+        longitud = self.config.snake_longitud
+        
+        # Cuerpo de la serpiente (cola de (x, y), la cabeza primero) y
+        # conteo de segmentos por celda para consultas en O(1)
+        self.snake_cuerpo = deque()
+        self.snake_ocupadas = {}
         for i in range(longitud):
-            self.snake_cuerpo.append([self.snake_x - i, self.snake_y])
+            segmento = (self.snake_x - i, self.snake_y)
+            self.snake_cuerpo.append(segmento)
+            self.snake_ocupadas[segmento] = self.snake_ocupadas.get(segmento, 0) + 1
         
         # Dirección inicial (derecha)
         self.snake_dir_x = 1
@@ -133,7 +329,7 @@ class Juego(object):
         self.generar_comida()
         
         # Control de velocidad
-        self.snake_velocidad = serpiente_config.get('velocidad', 5.0)
+        self.snake_velocidad = self.config.snake_velocidad
         self.snake_tiempo_ultimo_mov = time.time()
         
         # Actualizar grid inicial
@@ -145,29 +341,13 @@ class Juego(object):
             self.comida_x = random.randint(0, self.ancho - 1)
             self.comida_y = random.randint(0, self.alto - 1)
             # Verificar que no esté en el cuerpo de la serpiente
-            if [self.comida_x, self.comida_y] not in self.snake_cuerpo:
+            if (self.comida_x, self.comida_y) not in self.snake_ocupadas:
                 break
     
     def inicializar_tetris(self):
         """Inicializa el juego Tetris"""
-        # Obtener figuras disponibles del JSON
-        figuras_nombres = []
-        for key in self.datos.keys():
-            if key.startswith('figura'):
-                figuras_nombres.append(key)
-        
-        self.tetris_figuras = []
-        for nombre in figuras_nombres:
-            figura = self.datos.get(nombre, {})
-            if 'patron' in figura:
-                self.tetris_figuras.append(figura)
-        
-        # Si no hay figuras, crear una básica
-        if not self.tetris_figuras:
-            self.tetris_figuras = [{
-                'color': 'cyan',
-                'patron': [[[1, 1, 1, 1]]]
-            }]
+        # Figuras disponibles, ya validadas en la configuración
+        self.tetris_figuras = self.config.tetris_figuras
         
         # Posición de la pieza actual
         self.tetris_pieza_x = self.ancho // 2 - 2
@@ -175,31 +355,52 @@ class Juego(object):
         self.tetris_pieza_rotacion = 0
         
         # Generar primera pieza
-        self.tetris_pieza_actual = random.choice(self.tetris_figuras)
+        self.tetris_nueva_pieza()
         
         # Control de velocidad
-        velocidad = self.datos.get('velocidadInicial', 1.0)
-        self.tetris_velocidad = velocidad
+        self.tetris_velocidad = self.config.tetris_velocidad
         self.tetris_tiempo_ultima_caida = time.time()
         
-        # Grid fijo (piezas ya colocadas)
-        self.tetris_grid_fijo = []
-        for i in range(self.alto):
-            fila = []
-            for j in range(self.ancho):
-                fila.append(' ')
-            self.tetris_grid_fijo.append(fila)
+        # Grid fijo disperso (piezas ya colocadas): fila -> {columna: celda}.
+        # Solo se guardan las filas y celdas ocupadas
+        self.tetris_grid_fijo = {}
+        
+        # Skyline: fila de la celda ocupada más alta de cada columna
+        # (self.alto si la columna está vacía)
+        self.tetris_alturas = [self.alto] * self.ancho
+        
+        # Perfiles inferiores precalculados por figura y rotación
+        self.tetris_perfiles = {}
+        
+        # Bombas fijadas: (x, y) -> tick de explosión, y ticks con alguna
+        # explosión pendiente para no recorrer las bombas en cada tick
+        self.tetris_tick = 0
+        self.tetris_bombas = {}
+        self.tetris_ticks_explosion = set()
         
         # Actualizar grid inicial
         self.actualizar_grid_tetris()
     
     def actualizar(self):
         """Actualiza el estado del juego"""
+        # Una acción (p. ej. la caída inmediata) puede terminar la partida
+        # en el mismo ciclo, antes de llegar aquí
+        if not self.jugando:
+            return
         if self.tipo_juego == 'snake':
             self.actualizar_snake()
         elif self.tipo_juego == 'tetris':
             self.actualizar_tetris()
     
+    def paso(self):
+        """Avanza un tick de simulación sin esperar al control de velocidad"""
+        if not self.jugando:
+            return
+        if self.tipo_juego == 'snake':
+            self.paso_snake()
+        elif self.tipo_juego == 'tetris':
+            self.paso_tetris()
+    
     def actualizar_snake(self):
         """Actualiza la lógica de Snake"""
         # Control de velocidad
@@ -210,14 +411,16 @@ class Juego(object):
             return
         
         self.snake_tiempo_ultimo_mov = tiempo_actual
-        
+        self.paso_snake()
+    
+    def paso_snake(self):
+        """Mueve la serpiente una casilla"""
         # Nueva posición de la cabeza
         nuevo_x = self.snake_cuerpo[0][0] + self.snake_dir_x
         nuevo_y = self.snake_cuerpo[0][1] + self.snake_dir_y
         
         # Verificar colisión con bordes
-        reglas = self.datos.get('reglasJuego', {})
-        if reglas.get('chocarConBorde', True):
+        if self.config.chocar_con_borde:
             if nuevo_x < 0 or nuevo_x >= self.ancho or nuevo_y < 0 or nuevo_y >= self.alto:
                 self.jugando = False
                 return
@@ -227,47 +430,57 @@ class Juego(object):
             nuevo_y = nuevo_y % self.alto
         
         # Verificar colisión consigo misma
-        if reglas.get('chocarConsigoMismo', True):
-            if [nuevo_x, nuevo_y] in self.snake_cuerpo:
+        if self.config.chocar_consigo_mismo:
+            if (nuevo_x, nuevo_y) in self.snake_ocupadas:
                 self.jugando = False
                 return
         
         # Insertar nueva cabeza
-        self.snake_cuerpo.insert(0, [nuevo_x, nuevo_y])
+        cabeza = (nuevo_x, nuevo_y)
+        self.snake_cuerpo.appendleft(cabeza)
+        self.snake_ocupadas[cabeza] = self.snake_ocupadas.get(cabeza, 0) + 1
         
         # Verificar si comió
         if nuevo_x == self.comida_x and nuevo_y == self.comida_y:
             # Aumentar puntuación
-            comida_config = self.datos.get('comida', {})
-            self.puntuacion += comida_config.get('puntos', 10)
+            self.puntuacion += self.config.puntos_comida
             # Generar nueva comida
             self.generar_comida()
         else:
             # Eliminar cola si no comió
-            self.snake_cuerpo.pop()
+            cola = self.snake_cuerpo.pop()
+            if self.snake_ocupadas[cola] > 1:
+                self.snake_ocupadas[cola] -= 1
+            else:
+                del self.snake_ocupadas[cola]
         
         # Actualizar grid
         self.actualizar_grid_snake()
     
     def actualizar_grid_snake(self):
         """Actualiza el grid con la serpiente y comida"""
+        # Seguir la cabeza con la ventana visible
+        cabeza_x, cabeza_y = self.snake_cuerpo[0]
+        self.centrar_vista(cabeza_x, cabeza_y)
+        
         # Limpiar grid
-        for i in range(self.alto):
-            for j in range(self.ancho):
-                self.grid[i][j] = ' '
+        self.grid[:] = self.grid_vacio
         
         # Dibujar comida
-        if 0 <= self.comida_y < self.alto and 0 <= self.comida_x < self.ancho:
-            self.grid[self.comida_y][self.comida_x] = '*'
+        y = self.comida_y - self.vista_y
+        x = self.comida_x - self.vista_x
+        if 0 <= y < self.vista_alto and 0 <= x < self.vista_ancho:
+            self.grid[y * self.vista_ancho + x] = self.CELDA_COMIDA
         
         # Dibujar serpiente
         for i, segmento in enumerate(self.snake_cuerpo):
-            x, y = segmento
-            if 0 <= y < self.alto and 0 <= x < self.ancho:
+            x = segmento[0] - self.vista_x
+            y = segmento[1] - self.vista_y
+            if 0 <= y < self.vista_alto and 0 <= x < self.vista_ancho:
                 if i == 0:
-                    self.grid[y][x] = 'O'  # Cabeza
+                    self.grid[y * self.vista_ancho + x] = self.CELDA_CABEZA
                 else:
-                    self.grid[y][x] = 'o'  # Cuerpo
+                    self.grid[y * self.vista_ancho + x] = self.CELDA_CUERPO
     
     def tetris_obtener_patron(self):
         """Obtiene el patrón actual de la pieza según su rotación"""
@@ -284,33 +497,155 @@ class Juego(object):
             return
         
         self.tetris_tiempo_ultima_caida = tiempo_actual
+        self.paso_tetris()
+    
+    def paso_tetris(self):
+        """Hace caer la pieza actual una fila"""
+        self.tetris_tick += 1
         
-        # Intentar mover pieza hacia abajo
-        self.tetris_pieza_y += 1
+        # Bajar la pieza o fijarla si ya está apoyada
+        if self.tetris_distancia_caida() > 0:
+            self.tetris_pieza_y += 1
+        else:
+            self.tetris_bloquear_pieza()
+        
+        # Explotar las bombas cuyo temporizador termina en este tick
+        if self.tetris_tick in self.tetris_ticks_explosion:
+            self.tetris_ticks_explosion.discard(self.tetris_tick)
+            self.tetris_detonar([posicion for posicion, tick in self.tetris_bombas.items()
+                                 if tick <= self.tetris_tick])
         
-        # Verificar colisión
+        # Actualizar grid visual
+        self.actualizar_grid_tetris()
+    
+    def tetris_bloquear_pieza(self):
+        """Fija la pieza, elimina líneas y genera la siguiente"""
+        # Fijar pieza en el grid
+        self.tetris_fijar_pieza()
+        
+        # Eliminar líneas completas
+        self.tetris_eliminar_lineas()
+        
+        # Generar nueva pieza
+        self.tetris_pieza_x = self.ancho // 2 - 2
+        self.tetris_pieza_y = 0
+        self.tetris_pieza_rotacion = 0
+        self.tetris_nueva_pieza()
+        
+        # Verificar game over
         if self.tetris_colision():
-            # Retroceder
-            self.tetris_pieza_y -= 1
-            
-            # Fijar pieza en el grid
-            self.tetris_fijar_pieza()
-            
-            # Eliminar líneas completas
-            self.tetris_eliminar_lineas()
-            
-            # Generar nueva pieza
-            self.tetris_pieza_x = self.ancho // 2 - 2
-            self.tetris_pieza_y = 0
-            self.tetris_pieza_rotacion = 0
+            self.jugando = False
+    
+    def tetris_nueva_pieza(self):
+        """Elige la siguiente pieza (una bomba con ProbabilidadBomba)"""
+        probabilidad = self.config.bomba_probabilidad
+        self.tetris_pieza_es_bomba = probabilidad > 0 and random.random() < probabilidad
+        if self.tetris_pieza_es_bomba:
+            self.tetris_pieza_actual = self.config.bomba_figura
+        else:
             self.tetris_pieza_actual = random.choice(self.tetris_figuras)
+    
+    def tetris_detonar(self, bombas):
+        """Explota las bombas indicadas, en cadena, y aplica gravedad
+        
+        Cada bomba vacía, fila a fila, los intervalos de su máscara de
+        explosión; las bombas alcanzadas se añaden a la cadena. Después
+        cada columna afectada se compacta en una sola pasada: las celdas
+        por encima de las destruidas bajan tantas filas como celdas
+        destruidas tengan debajo.
+        """
+        destruidas = {}  # columna -> filas vaciadas
+        pendientes = [posicion for posicion in bombas if posicion in self.tetris_bombas]
+        for posicion in pendientes:
+            del self.tetris_bombas[posicion]
+        
+        while pendientes:
+            bomba_x, bomba_y = pendientes.pop()
+            for dy, semiancho in self.config.bomba_mascara:
+                y = bomba_y + dy
+                if y < 0 or y >= self.alto:
+                    continue
+                fila = self.tetris_grid_fijo.get(y)
+                for x in range(max(0, bomba_x - semiancho), min(self.ancho, bomba_x + semiancho + 1)):
+                    destruidas.setdefault(x, set()).add(y)
+                    if fila and fila.pop(x, None) is not None and (x, y) in self.tetris_bombas:
+                        # Reacción en cadena
+                        del self.tetris_bombas[(x, y)]
+                        pendientes.append((x, y))
+                if fila is not None and not fila:
+                    del self.tetris_grid_fijo[y]
+        
+        # Gravedad por columnas
+        for x, filas in destruidas.items():
+            vaciadas = sorted(filas)
+            total = len(vaciadas)
+            for y in range(vaciadas[-1] - 1, self.tetris_alturas[x] - 1, -1):
+                fila = self.tetris_grid_fijo.get(y)
+                if not fila or x not in fila:
+                    continue
+                destino = y + total - bisect.bisect_right(vaciadas, y)
+                celda = fila.pop(x)
+                if not fila:
+                    del self.tetris_grid_fijo[y]
+                self.tetris_grid_fijo.setdefault(destino, {})[x] = celda
+                if (x, y) in self.tetris_bombas:
+                    self.tetris_bombas[(x, destino)] = self.tetris_bombas.pop((x, y))
             
-            # Verificar game over
-            if self.tetris_colision():
-                self.jugando = False
+            # El tope de la columna solo puede bajar
+            altura = self.tetris_alturas[x]
+            while altura < self.alto and x not in self.tetris_grid_fijo.get(altura, ()):
+                altura += 1
+            self.tetris_alturas[x] = altura
+        
+        # La gravedad puede completar líneas
+        self.tetris_eliminar_lineas()
+    
+    def tetris_perfil_inferior(self):
+        """Celdas inferiores (columna, fila) del patrón actual
         
-        # Actualizar grid visual
-        self.actualizar_grid_tetris()
+        Solo incluye las celdas que no tienen otra celda de la pieza justo
+        debajo, que son las únicas que pueden chocar al caer.
+        """
+        patrones = self.tetris_pieza_actual.get('patron', [[[]]])
+        rotacion = self.tetris_pieza_rotacion % len(patrones)
+        clave = (id(self.tetris_pieza_actual), rotacion)
+        
+        perfil = self.tetris_perfiles.get(clave)
+        if perfil is None:
+            patron = patrones[rotacion]
+            perfil = []
+            for i, fila in enumerate(patron):
+                for j, celda in enumerate(fila):
+                    if celda:
+                        debajo = patron[i + 1] if i + 1 < len(patron) else []
+                        if j >= len(debajo) or not debajo[j]:
+                            perfil.append((j, i))
+            self.tetris_perfiles[clave] = perfil
+        return perfil
+    
+    def tetris_distancia_caida(self):
+        """Filas que puede bajar la pieza actual antes de apoyarse
+        
+        Usa el skyline de columnas, así que el coste es una pasada por las
+        columnas de la pieza en lugar de una comprobación por fila.
+        """
+        distancia = self.alto
+        for j, i in self.tetris_perfil_inferior():
+            x = self.tetris_pieza_x + j
+            y = self.tetris_pieza_y + i
+            if x < 0 or x >= self.ancho:
+                # Fuera del tablero (tableros más estrechos que la pieza):
+                # igual que tetris_colision, la pieza no puede bajar
+                return 0
+            tope = self.tetris_alturas[x]
+            if tope <= y:
+                # La pieza está bajo un saliente: buscar el primer bloque
+                # de la columna por debajo de la celda
+                tope = y + 1
+                while tope < self.alto and x not in self.tetris_grid_fijo.get(tope, ()):
+                    tope += 1
+            distancia = min(distancia, tope - 1 - y)
+        return distancia
     
     def tetris_colision(self):
         """Verifica si la pieza actual colisiona"""
@@ -327,7 +662,7 @@ class Juego(object):
                         return True
                     
                     # Verificar grid fijo
-                    if y >= 0 and self.tetris_grid_fijo[y][x] != ' ':
+                    if y >= 0 and x in self.tetris_grid_fijo.get(y, ()):
                         return True
         
         return False
@@ -336,6 +671,11 @@ class Juego(object):
         """Fija la pieza actual en el grid"""
         patron = self.tetris_obtener_patron()
         
+        # Las bombas explotan tiempoExplosion ticks de caída después
+        if self.tetris_pieza_es_bomba:
+            explosion = self.tetris_tick + self.config.bomba_tiempo
+            self.tetris_ticks_explosion.add(explosion)
+        
         for i, fila in enumerate(patron):
             for j, celda in enumerate(fila):
                 if celda:
@@ -343,113 +683,158 @@ class Juego(object):
                     y = self.tetris_pieza_y + i
                     
                     if 0 <= y < self.alto and 0 <= x < self.ancho:
-                        self.tetris_grid_fijo[y][x] = '#'
+                        if self.tetris_pieza_es_bomba:
+                            self.tetris_grid_fijo.setdefault(y, {})[x] = self.CELDA_BOMBA
+                            self.tetris_bombas[(x, y)] = explosion
+                        else:
+                            self.tetris_grid_fijo.setdefault(y, {})[x] = self.CELDA_BLOQUE
+                        if y < self.tetris_alturas[x]:
+                            self.tetris_alturas[x] = y
     
     def tetris_eliminar_lineas(self):
         """Elimina líneas completas"""
-        lineas_eliminadas = 0
-        y = self.alto - 1
-        
-        while y >= 0:
-            # Verificar si la línea está completa
-            if all(self.tetris_grid_fijo[y][x] != ' ' for x in range(self.ancho)):
-                # Eliminar línea
-                del self.tetris_grid_fijo[y]
-                # Agregar línea vacía arriba
-                nueva_fila = [' '] * self.ancho
-                self.tetris_grid_fijo.insert(0, nueva_fila)
-                lineas_eliminadas += 1
-                # No incrementar y para revisar la misma posición de nuevo
+        # Solo se recorren las filas ocupadas; una fila está completa
+        # cuando tiene tantas celdas como columnas el tablero
+        eliminadas = sorted(y for y, fila in self.tetris_grid_fijo.items()
+                            if len(fila) == self.ancho)
+        
+        if not eliminadas:
+            return
+        
+        # Eliminar líneas y bajar las filas superiores tantas posiciones
+        # como líneas eliminadas haya debajo de ellas
+        total = len(eliminadas)
+        grid_fijo = {}
+        for y, fila in self.tetris_grid_fijo.items():
+            if len(fila) != self.ancho:
+                grid_fijo[y + total - bisect.bisect_right(eliminadas, y)] = fila
+        self.tetris_grid_fijo = grid_fijo
+        
+        # Las bombas de las líneas eliminadas desaparecen y el resto baja
+        if self.tetris_bombas:
+            bombas = {}
+            for (x, y), tick in self.tetris_bombas.items():
+                indice = bisect.bisect_left(eliminadas, y)
+                if indice == total or eliminadas[indice] != y:
+                    bombas[(x, y + total - indice)] = tick
+            self.tetris_bombas = bombas
+        
+        # Actualizar el skyline: las columnas bajan tantas filas como líneas
+        # eliminadas haya debajo de su tope; si el tope era una línea
+        # eliminada se busca el siguiente bloque de la columna
+        for x in range(self.ancho):
+            altura = self.tetris_alturas[x]
+            if altura >= self.alto:
+                continue
+            indice = bisect.bisect_left(eliminadas, altura)
+            if indice < total and eliminadas[indice] == altura:
+                while altura < self.alto and x not in self.tetris_grid_fijo.get(altura, ()):
+                    altura += 1
             else:
-                y -= 1
+                altura += total - indice
+            self.tetris_alturas[x] = altura
         
         # Actualizar puntuación
-        if lineas_eliminadas > 0:
-            self.puntuacion += self.TETRIS_SCORE_VALUES[min(lineas_eliminadas, 4)]
+        self.puntuacion += self.TETRIS_SCORE_VALUES[min(total, 4)]
     
     def actualizar_grid_tetris(self):
         """Actualiza el grid con Tetris"""
-        # Copiar grid fijo
-        for i in range(self.alto):
-            for j in range(self.ancho):
-                self.grid[i][j] = self.tetris_grid_fijo[i][j]
-        
-        # Dibujar pieza actual
+        # Seguir la pieza actual con la ventana visible
+        self.centrar_vista(self.tetris_pieza_x + 2, self.tetris_pieza_y + 2)
+        
+        # Limpiar grid y copiar las celdas fijas visibles
+        self.grid[:] = self.grid_vacio
+        for i in range(self.vista_alto):
+            fila = self.tetris_grid_fijo.get(self.vista_y + i)
+            if fila:
+                base = i * self.vista_ancho
+                for x, celda in fila.items():
+                    j = x - self.vista_x
+                    if 0 <= j < self.vista_ancho:
+                        self.grid[base + j] = celda
+        
+        # Dibujar pieza fantasma (posición de aterrizaje) y pieza actual
         patron = self.tetris_obtener_patron()
-        
-        for i, fila in enumerate(patron):
-            for j, celda in enumerate(fila):
-                if celda:
-                    x = self.tetris_pieza_x + j
-                    y = self.tetris_pieza_y + i
-                    
-                    if 0 <= y < self.alto and 0 <= x < self.ancho:
-                        self.grid[y][x] = '#'
+        distancia = self.tetris_distancia_caida()
+        
+        pieza = self.CELDA_BOMBA if self.tetris_pieza_es_bomba else self.CELDA_BLOQUE
+        for desplazamiento, simbolo in ((distancia, self.CELDA_FANTASMA), (0, pieza)):
+            for i, fila in enumerate(patron):
+                for j, celda in enumerate(fila):
+                    if celda:
+                        x = self.tetris_pieza_x + j - self.vista_x
+                        y = self.tetris_pieza_y + i + desplazamiento - self.vista_y
+                        
+                        if 0 <= y < self.vista_alto and 0 <= x < self.vista_ancho:
+                            self.grid[y * self.vista_ancho + x] = simbolo
     
     def procesar_input(self):
         """Procesa la entrada del usuario"""
         tecla = obtener_tecla()
         if tecla:
-            controles = self.datos.get('controles', {})
-            
-            # Verificar si se presionó pausar o reiniciar
-            if tecla == controles.get('pausar', 'p'):
-                print('\nJuego pausado. Presiona cualquier tecla para continuar...')
-                if sys.version_info[0] >= 3:
-                    input()
-                else:
-                    raw_input()
-            elif tecla == controles.get('reiniciar', 'r'):
-                self.reiniciar()
-            # Procesar controles de movimiento para Snake
-            elif self.tipo_juego == 'snake':
-                if tecla == controles.get('moverArriba', 'w'):
-                    # No permitir moverse en dirección opuesta
-                    if self.snake_dir_y != 1:
-                        self.snake_dir_x = 0
-                        self.snake_dir_y = -1
-                elif tecla == controles.get('moverAbajo', 's'):
-                    if self.snake_dir_y != -1:
-                        self.snake_dir_x = 0
-                        self.snake_dir_y = 1
-                elif tecla == controles.get('moverIzquierda', 'a'):
-                    if self.snake_dir_x != 1:
-                        self.snake_dir_x = -1
-                        self.snake_dir_y = 0
-                elif tecla == controles.get('moverDerecha', 'd'):
-                    if self.snake_dir_x != -1:
-                        self.snake_dir_x = 1
-                        self.snake_dir_y = 0
-            # Procesar controles para Tetris
-            elif self.tipo_juego == 'tetris':
-                if tecla == controles.get('moverIzquierda', 'a'):
-                    self.tetris_pieza_x -= 1
-                    if self.tetris_colision():
-                        self.tetris_pieza_x += 1
-                elif tecla == controles.get('moverDerecha', 'd'):
+            self.ejecutar_accion(self.config.acciones.get(tecla))
+    
+    def ejecutar_accion(self, accion):
+        """Aplica una acción de control ('moverArriba', 'pausar', ...)"""
+        # Verificar si se presionó pausar o reiniciar
+        if accion == 'pausar':
+            print('\nJuego pausado. Presiona cualquier tecla para continuar...')
+            if sys.version_info[0] >= 3:
+                input()
+            else:
+                raw_input()
+        elif accion == 'reiniciar':
+            self.reiniciar()
+        # Procesar controles de movimiento para Snake
+        elif self.tipo_juego == 'snake':
+            if accion == 'moverArriba':
+                # No permitir moverse en dirección opuesta
+                if self.snake_dir_y != 1:
+                    self.snake_dir_x = 0
+                    self.snake_dir_y = -1
+            elif accion == 'moverAbajo':
+                if self.snake_dir_y != -1:
+                    self.snake_dir_x = 0
+                    self.snake_dir_y = 1
+            elif accion == 'moverIzquierda':
+                if self.snake_dir_x != 1:
+                    self.snake_dir_x = -1
+                    self.snake_dir_y = 0
+            elif accion == 'moverDerecha':
+                if self.snake_dir_x != -1:
+                    self.snake_dir_x = 1
+                    self.snake_dir_y = 0
+        # Procesar controles para Tetris
+        elif self.tipo_juego == 'tetris' and accion:
+            if accion == 'moverIzquierda':
+                self.tetris_pieza_x -= 1
+                if self.tetris_colision():
                     self.tetris_pieza_x += 1
-                    if self.tetris_colision():
-                        self.tetris_pieza_x -= 1
-                elif tecla == controles.get('acelerarAbajo', 's'):
+            elif accion == 'moverDerecha':
+                self.tetris_pieza_x += 1
+                if self.tetris_colision():
+                    self.tetris_pieza_x -= 1
+            elif accion == 'acelerarAbajo':
+                if self.tetris_distancia_caida() > 0:
                     self.tetris_pieza_y += 1
-                    if self.tetris_colision():
-                        self.tetris_pieza_y -= 1
-                elif tecla == controles.get('evitarCaida', 'w'):
-                    # Rotar pieza
-                    self.tetris_pieza_rotacion += 1
-                    if self.tetris_colision():
-                        self.tetris_pieza_rotacion -= 1
+            elif accion == 'caidaInmediata':
+                # Bajar la pieza hasta apoyarse y fijarla
+                self.tetris_pieza_y += self.tetris_distancia_caida()
+                self.tetris_bloquear_pieza()
+            elif accion == 'evitarCaida':
+                # Rotar pieza
+                self.tetris_pieza_rotacion += 1
+                if self.tetris_colision():
+                    self.tetris_pieza_rotacion -= 1
+                
+            # Redibujar para reflejar el movimiento y la pieza fantasma
+            self.actualizar_grid_tetris()
     
     def reiniciar(self):
         """Reinicia el juego"""
         self.puntuacion = 0
         self.jugando = True
-        self.grid = []
-        for i in range(self.alto):
-            fila = []
-            for j in range(self.ancho):
-                fila.append(' ')
-            self.grid.append(fila)
+        self.crear_grid()
         
         # Reinicializar según tipo de juego
         if self.tipo_juego == 'snake':
@@ -488,21 +873,42 @@ def cargar_json(ruta):
         with open(ruta, 'r') as f:
             return json.load(f)
 
+def compilar_brik(ruta):
+    """Compila un archivo .brik en memoria y devuelve su AST"""
+    # Importación diferida: el compilador solo se carga al usar un .brik
+    from compiler import Tokenizador, Parser, cargar_archivo
+    
+    codigo = cargar_archivo(ruta)
+    if codigo is None:
+        raise IOError('No se pudo leer el archivo: ' + ruta)
+    
+    tokens = Tokenizador(codigo).tokenizar()
+    return Parser(tokens).parse()
+
+def cargar_juego(ruta):
+    """Carga los datos del juego desde un .brik (compilando) o un .json"""
+    if ruta.endswith('.brik'):
+        return compilar_brik(ruta)
+    return cargar_json(ruta)
+
 def main():
     """Función principal del runtime"""
     if len(sys.argv) < 2:
         sys.exit(1)
     
-    archivo_json = sys.argv[1]
+    archivo_juego = sys.argv[1]
     
     try:
         # Cargar datos del juego
-        datos = cargar_json(archivo_json)
+        datos = cargar_juego(archivo_juego)
+        
+        # Crear el juego antes de empezar para validar la configuración
+        juego = Juego(datos)
         
         print('========================================')
         print('BrickScript Runtime Engine')
         print('========================================')
-        print('Cargando: ' + archivo_json)
+        print('Cargando: ' + archivo_juego)
         print('Juego: ' + datos.get('nombreJuego', 'Desconocido'))
         print('\nPresiona Enter para comenzar...')
         
@@ -511,12 +917,14 @@ def main():
         else:
             raw_input()
         
-        # Crear y ejecutar el juego
-        juego = Juego(datos)
+        # Ejecutar el juego
         juego.run()
         
     except IOError:
-        print('Error: No se pudo leer el archivo: ' + archivo_json)
+        print('Error: No se pudo leer el archivo: ' + archivo_juego)
+        sys.exit(1)
+    except (ValueError, SyntaxError, NameError, TypeError) as e:
+        print('\nError: ' + str(e))
         sys.exit(1)
     except KeyboardInterrupt:
         print('\n\nJuego interrumpido.')